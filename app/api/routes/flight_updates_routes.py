@@ -1,19 +1,17 @@
-import json
-from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import List, Optional
-from pydantic import constr
-from app.schemas.flight_updates_schema import FlightRequest, FlightResponse
-from app.services.flight_updates_service import FlightUpdateService
+import re
+import orjson
+from fastapi import APIRouter, Depends, Query, HTTPException, Security
+from fastapi.security import HTTPAuthorizationCredentials
 from app.core.exceptions import ValidationError
-from app.core.dependencies import get_current_user  
-from app.db.database_service import DBService  
+from app.core.auth import bearer_scheme
+from app.core.dependencies import get_current_user, verify_and_prefetch
+from app.db.database_service import db_service
 import logging
-from app.services.rapid_flight_service import RapidFlightService  
+from app.services.rapid_flight_service import rapit_service
 from fastapi import status
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import ORJSONResponse, Response
 
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Flight"])
@@ -22,6 +20,10 @@ router = APIRouter(tags=["Flight"])
 RATE_LIMIT = 10  
 RATE_LIMIT_WINDOW = 60  
 
+# Flight numbers are short alphanumerics; the length cap keeps validation
+# constant-time for oversized path segments
+_FLIGHT_NUMBER_RE = re.compile(r"\A[A-Za-z0-9]{1,10}\Z")
+
 
 @router.get("/flights/search-history")
 async def get_flight_search_history(
@@ -32,40 +34,41 @@ async def get_flight_search_history(
     Retrieve user's flight search history.
     Requires authentication.
     """
-    db_service = DBService()
     history = await db_service.get_user_flight_search_history(
-        user_id=str(current_user["id"]),
+        user_id=current_user["id_str"],
         limit=limit
     )
-    return history
+    # History rows are plain dicts straight from Mongo; serialize them
+    # once with orjson rather than walking them through jsonable_encoder
+    return Response(content=orjson.dumps(history), media_type="application/json")
 
 
-@router.get("/flights/info/{flight_number}", response_model=FlightResponse)
+@router.get("/flights/info/{flight_number}")
 async def get_flight_info(
-    flight_number: str,  
-    current_user: dict = Depends(get_current_user)
-) -> JSONResponse:
+    flight_number: str,
+    credentials: HTTPAuthorizationCredentials = Security(bearer_scheme)
+) -> ORJSONResponse:
     """
     Get flight information by flight number.
     Requires authentication.
     """
     try:
-        logger.info(f"Fetching flight info for flight number: {flight_number} by user: {current_user['id']}")
-
-        if not flight_number.isalnum():
+        if not _FLIGHT_NUMBER_RE.match(flight_number):
             raise ValidationError(detail="Invalid flight number format. Must be alphanumeric.")
 
-        # Initialize services
-        rapid_service = RapidFlightService()
-        db_service = DBService()
+        # The upstream fetch doesn't depend on who is asking — only the
+        # history enqueue below does — so token verification and the
+        # fetch run concurrently instead of back to back
+        current_user, flight_data = await verify_and_prefetch(
+            credentials.credentials,
+            rapit_service.fetch_flight_data(flight_number)
+        )
+        logger.info(f"Fetching flight info for flight number: {flight_number} by user: {current_user['id']}")
 
-        
-        flight_data = await rapid_service.fetch_flight_data(flight_number)
-        
         # Check if flight data is valid
         if not flight_data or not flight_data.get(flight_number):
             logger.warning(f"Flight not found: {flight_number}")
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=status.HTTP_404_NOT_FOUND,
                 content={
                     "status": False,
@@ -87,9 +90,10 @@ async def get_flight_info(
             "arr_iata": flight_info.get("arr_airport", {}).get("iata")
         }
         
-        # Save to search history with additional details
-        await db_service.save_flight_search_history(
-            user_id=str(current_user["id"]),
+        # Queue the search-history write; the background writer batches
+        # and flushes these off the request path
+        db_service.enqueue_history(
+            user_id=current_user["id_str"],
             flight_details=flight_details
         )
 
@@ -97,7 +101,7 @@ async def get_flight_info(
         logger.info(f"Successfully fetched flight info for: {flight_number}")
         
         
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_200_OK,
             content={
                 "status": True,
@@ -1,26 +1,25 @@
+import asyncio
 import json
-from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect,HTTPException
-from typing import List
-from app.schemas.flight_updates_schema import FlightRequest, FlightResponse
-from app.services.flight_updates_service import FlightUpdateService
-from app.core.exceptions import ValidationError
-from fastapi.responses import StreamingResponse
-from app.core.dependencies import get_current_user  
-from app.db.database_service import DBService  
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
+from app.db.database_service import db_service
 import logging
-from app.core.auth import AuthMiddleware, authenticate_websocket
+from app.core.auth import authenticate_websocket
 from app.services.rapid_flight_service import RapidFlightService
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Keep strong references to fire-and-forget tasks so they aren't
+# garbage-collected before completion
+_background_tasks: set = set()
+
 @router.websocket("/ws/flight/{flight_icao}")
 async def websocket_flight_data(websocket: WebSocket, flight_icao: str):
     """WebSocket endpoint for streaming flight data"""
     connection_active = False
     
     try:
-        logger.debug(f"New WebSocket connection attempt for flight {flight_icao}")
+        logger.debug("New WebSocket connection attempt for flight %s", flight_icao)
         
         # Accept the connection first so error messages can be sent if needed
         await websocket.accept()
@@ -28,27 +27,32 @@ async def websocket_flight_data(websocket: WebSocket, flight_icao: str):
         
         # Authenticate after accepting connection
         user = await authenticate_websocket(websocket)
-        logger.info(f"User {user['id']} connected to flight {flight_icao}")
+        logger.info("User %s connected to flight %s", user['id'], flight_icao)
         
         rapid_flight_service = RapidFlightService()
         
-        # Save search history
-        db_service = DBService()
-        await db_service.save_flight_search_history(
-            user_id=str(user["id"]),
-            flights=[flight_icao]
-        )
+        # Save search history without blocking the stream start. Only the
+        # searched flight code is known at this point; the route fields
+        # are filled in when the flight details are fetched later.
+        task = asyncio.create_task(db_service.save_flight_search_history(
+            user_id=user["id_str"],
+            flight_details={
+                "flight_number": flight_icao,
+                "flight_iata": flight_icao,
+                "dep_city": None,
+                "dep_iata": None,
+                "arr_city": None,
+                "arr_iata": None,
+            }
+        ))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
         
+        # Send errors are handled by the outer except blocks, so the loop
+        # body stays free of per-message exception handling
         async for data in rapid_flight_service.stream_flight_data(flight_icao):
-            try:
-                await websocket.send_text(data)
-            except WebSocketDisconnect:
-                logger.info("Client disconnected during streaming")
-                break
-            except Exception as e:
-                logger.error(f"Error sending data: {str(e)}")
-                break
-                
+            await websocket.send_bytes(data)
+
     except WebSocketDisconnect:
         logger.info("Client disconnected normally")
     
@@ -1,95 +1,158 @@
-from fastapi import HTTPException, Security, Depends, WebSocket
+from fastapi import HTTPException, Security, WebSocket
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+import hashlib
 import httpx
-from typing import Optional
-import json
+import orjson
 import logging
 import asyncio
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import random
+import time
+import jwt
+from cachetools import TTLCache
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Single bearer scheme shared by all dependencies, so FastAPI resolves one
+# security object and the OpenAPI schema lists one auth scheme
+bearer_scheme = HTTPBearer()
+
+# Verified-token cache: skips the auth-service round-trip for tokens seen
+# within the TTL. Keyed by a token digest so raw tokens never sit in memory.
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=settings.AUTH_CACHE_TTL)
+
+
+def _cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+def _reject_if_expired(token: str) -> None:
+    """Reject malformed or already-expired JWTs without a network call.
+
+    The signature is still verified by the auth service; this only
+    short-circuits the guaranteed-401 cases locally.
+    """
+    if token.count(".") != 2:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    try:
+        payload = jwt.decode(
+            token, options={"verify_signature": False, "verify_exp": False}
+        )
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    exp = payload.get("exp")
+    if exp is not None and exp < time.time():
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
 class AuthMiddleware:
     def __init__(self):
-        self.security = HTTPBearer()
         self.verify_url = "https://fastapi-auth-4rl3.onrender.com/api/v1/auth/verify"
         self.timeout = httpx.Timeout(10.0, connect=5.0)  # 10s timeout, 5s connect timeout
-        
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10),
-        retry=retry_if_exception_type(httpx.RequestError)
-    )
+        # Long-lived pooled client so verify calls reuse keep-alive
+        # connections instead of paying a TLS handshake each time
+        self._client = httpx.AsyncClient(
+            http2=True,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_keepalive_connections=50,
+                max_connections=100,
+                keepalive_expiry=30
+            )
+        )
+
+        # In-flight verifications by token digest, so concurrent requests
+        # carrying the same token share one upstream call
+        self._inflight: dict = {}
+
+    async def aclose(self):
+        """Close the pooled client; called on application shutdown."""
+        await self._client.aclose()
+
+    # Retries sized for a user-facing latency budget: ~100ms jittered
+    # backoff, three attempts, well under a second in the worst case
+    MAX_RETRIES = 3
+    RETRY_BASE_DELAY = 0.1
+
     async def _make_auth_request(self, token: str) -> dict:
         """Make HTTP request to auth service with retry logic"""
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
+        for attempt in range(self.MAX_RETRIES):
             try:
-                response = await client.get(
+                response = await self._client.get(
                     self.verify_url,
                     headers={"Authorization": f"Bearer {token}"}
                 )
-                
+
                 response.raise_for_status()
-                return response.json()
-                
+                return orjson.loads(response.content)
+
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 401:
                     raise HTTPException(
                         status_code=401,
                         detail="Invalid or expired token"
                     )
+                # Cap the echoed body: a misbehaving auth service returning a
+                # large error page shouldn't be stringified wholesale into
+                # every failed response
                 raise HTTPException(
                     status_code=e.response.status_code,
-                    detail=f"Auth service error: {e.response.text}"
+                    detail=f"Auth service error: {e.response.text[:256]}"
                 )
             except httpx.RequestError as e:
                 logger.error(f"Request to auth service failed: {str(e)}")
-                raise
-    async def verify_token(self, credentials: HTTPAuthorizationCredentials = Security(HTTPBearer())) -> dict:
+                if attempt == self.MAX_RETRIES - 1:
+                    raise
+                delay = self.RETRY_BASE_DELAY * (2 ** attempt)
+                await asyncio.sleep(delay * (1 + random.random() * 0.5))
+    async def verify_token(self, credentials: HTTPAuthorizationCredentials = Security(bearer_scheme)) -> dict:
         """
         Verify JWT token with external auth service and return user details
         """
-        token = credentials.credentials
-        
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    self.verify_url,
-                    headers={"Authorization": f"Bearer {token}"}
-                )
-                
-                if response.status_code == 401:
-                    raise HTTPException(
-                        status_code=401,
-                        detail="Invalid or expired token"
-                    )
-                elif response.status_code != 200:
-                    raise HTTPException(
-                        status_code=500,
-                        detail="Error verifying token"
-                    )
-                
-                # Extract user details from the response
-                user_data = response.json().get("data")
-                if not user_data:
-                    raise HTTPException(
-                        status_code=500,
-                        detail="No user data found in response"
-                    )
-                return user_data 
-            except httpx.RequestError:
-                raise HTTPException(
-                    status_code=503,
-                    detail="Authentication service unavailable"
-                )
-                
+        # Delegate so HTTP dependencies share the cached/coalesced/retried
+        # path instead of keeping a second, uncached network path alive
+        return await self.decode_token(credentials.credentials)
+
     async def decode_token(self, token: str) -> dict:
         """
         Verify JWT token with external auth service and return user details
         """
+        _reject_if_expired(token)
+
+        key = _cache_key(token)
+        cached = _token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Coalesce concurrent verifications of the same token: followers
+        # await the leader's future instead of issuing their own call
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await inflight
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception retrieved even if every awaiter has gone away,
+        # so asyncio doesn't log "exception was never retrieved"
+        future.add_done_callback(
+            lambda f: f.exception() if not f.cancelled() else None
+        )
+        self._inflight[key] = future
+        try:
+            user_data = await self._verify_remote(token)
+            _token_cache[key] = user_data
+            future.set_result(user_data)
+            return user_data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _verify_remote(self, token: str) -> dict:
+        """Call the auth service and extract the user payload."""
         try:
             response_data = await self._make_auth_request(token)
-            
+
             user_data = response_data.get("data")
             if not user_data:
                 raise HTTPException(
@@ -97,7 +160,7 @@ class AuthMiddleware:
                     detail="No user data found in response"
                 )
             return user_data
-            
+
         except HTTPException:
             raise
         except Exception as e:
@@ -108,6 +171,11 @@ class AuthMiddleware:
             )
 
 
+# Shared instance so every request and websocket handshake reuses the same
+# pooled client, cache, and in-flight table
+auth_handler = AuthMiddleware()
+
+
 # WebSocket authentication functions
 async def get_token_from_query(websocket: WebSocket) -> str:
     """Extract token from WebSocket query parameters"""
@@ -115,29 +183,28 @@ async def get_token_from_query(websocket: WebSocket) -> str:
         token = websocket.query_params.get("token")
         if not token:
             raise HTTPException(status_code=403, detail="Missing authentication token")
-        logger.debug(f"Extracted token: {token[:20]}...")
+        logger.debug("Extracted token: %s...", token[:20])
         return token
     except Exception as e:
         logger.error(f"Error extracting token: {str(e)}")
         raise HTTPException(status_code=403, detail="Error extracting authentication token")
 
 async def authenticate_websocket(websocket: WebSocket) -> dict:
-    """Authenticate WebSocket connection with retry logic"""
+    """Authenticate a WebSocket connection.
+
+    Retries are owned by AuthMiddleware._make_auth_request; adding another
+    layer here multiplied the attempts and the handshake time under auth-
+    service degradation.
+    """
     try:
         token = await get_token_from_query(websocket)
-        auth_handler = AuthMiddleware()
-        
-        # Try authentication with retries
-        for attempt in range(3):
-            try:
-                user = await auth_handler.decode_token(token)
-                logger.debug(f"Authentication successful for user: {user.get('id', 'unknown')}")
-                return user
-            except HTTPException as e:
-                if e.status_code != 503 or attempt == 2:  # Don't retry on non-503 errors or last attempt
-                    raise
-                await asyncio.sleep(1 * (attempt + 1))  
-                
+
+        user = await auth_handler.decode_token(token)
+        if "id" in user:
+            user["id_str"] = str(user["id"])
+        logger.debug("Authentication successful for user: %s", user.get("id", "unknown"))
+        return user
+
     except HTTPException as e:
         logger.error(f"Authentication failed: {e.detail}")
         raise
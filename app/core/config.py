@@ -1,7 +1,11 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore", frozen=True)
+
     PROJECT_NAME: str = "BoardAndGo fastapi service"
     VERSION: str = "1.0.0"
     API_V1_STR: str = "/api/v1"
@@ -30,12 +34,22 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_REQUESTS: int = 100
     RATE_LIMIT_WINDOW: int = 60
+
+    # Auth
+    AUTH_CACHE_TTL: int = 30
     
     # Monitoring
     SENTRY_DSN: Optional[str] = None
+    SENTRY_TRACES_SAMPLE_RATE: float = 0.05
+    # httpx spans cover the auth-service hot loop; off unless debugging
+    TRACE_HTTPX: bool = False
     
     
-    class Config:
-        env_file = ".env"
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Build Settings once; .env parsing and validation are not free."""
+    return Settings()
+
+
+settings = get_settings()
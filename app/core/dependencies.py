@@ -1,10 +1,10 @@
 
-from fastapi import HTTPException, Security, Depends
+import asyncio
+from typing import Awaitable, Tuple
 
-from app.core.auth import AuthMiddleware
+from fastapi import HTTPException, Security, Depends
 
-# Create an instance of the middleware
-auth_handler = AuthMiddleware()
+from app.core.auth import auth_handler
 
 # Dependency to be used in routes
 async def get_current_user(
@@ -18,4 +18,24 @@ async def get_current_user(
             status_code=401,
             detail="Could not validate credentials"
         )
-    return user_details
\ No newline at end of file
+    # Stringify the id once here so handlers don't re-do it per use
+    if "id" in user_details:
+        user_details["id_str"] = str(user_details["id"])
+    return user_details
+
+
+async def verify_and_prefetch(token: str, prefetch: Awaitable) -> Tuple[dict, object]:
+    """
+    Run token verification and an independent I/O operation concurrently.
+
+    For handlers whose first query doesn't depend on the verified identity,
+    this overlaps the auth round-trip with the query instead of serializing
+    them. Returns (user, prefetch result).
+    """
+    user, result = await asyncio.gather(
+        auth_handler.decode_token(token),
+        prefetch
+    )
+    if "id" in user:
+        user["id_str"] = str(user["id"])
+    return user, result
\ No newline at end of file
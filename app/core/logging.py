@@ -1,41 +1,87 @@
 import logging
-import json
-from datetime import datetime
+import logging.handlers
+import orjson
+import queue
+import time
 from typing import Any, Dict
 import sys
 
+# All records logged within the same second reuse one strftime result;
+# only the microsecond suffix is formatted per record
+_ts_cache: Dict[int, str] = {}
+
+
+def _format_timestamp(created: float) -> str:
+    sec = int(created)
+    base = _ts_cache.get(sec)
+    if base is None:
+        base = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _ts_cache.clear()
+        _ts_cache[sec] = base
+    return f"{base}.{int((created % 1) * 1e6):06d}Z"
+
+
 class JSONFormatter(logging.Formatter):
     """Custom JSON formatter for structured logging."""
-    
+
     def format(self, record: logging.LogRecord) -> str:
+        # getMessage() runs msg % args even with no args; skip it for the
+        # common unparameterized record
+        message = record.getMessage() if record.args else str(record.msg)
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _format_timestamp(record.created),
             "level": record.levelname,
-            "message": record.getMessage(),
+            "message": message,
             "module": record.module,
             "function": record.funcName,
         }
-        
-        if hasattr(record, "props"):
-            log_data.update(record.props)
-            
+
+        props = getattr(record, "props", None)
+        if props:
+            log_data.update(props)
+
         if record.exc_info:
             log_data["exception"] = self.formatException(record.exc_info)
-            
-        return json.dumps(log_data)
+
+        return orjson.dumps(log_data).decode()
+
+_queue_listener: "logging.handlers.QueueListener" = None
+
 
 def setup_logging() -> None:
-    """Configure application logging."""
+    """Configure application logging.
+
+    Handlers are fed through a queue so log calls on the request path cost
+    an enqueue instead of blocking on stream I/O.
+    """
+    global _queue_listener
+
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
-    
-    # Console handler with JSON formatting
+
+    # Console handler with JSON formatting, drained by a listener thread
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(JSONFormatter())
-    logger.addHandler(console_handler)
-    
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _queue_listener = logging.handlers.QueueListener(
+        log_queue, console_handler, respect_handler_level=True
+    )
+    _queue_listener.start()
+
     # Suppress external library logging
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("asyncio").setLevel(logging.WARNING)
 
+
+def stop_logging() -> None:
+    """Flush and stop the queue listener; called on application shutdown."""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
 logger = logging.getLogger(__name__)
\ No newline at end of file
@@ -1,3 +1,4 @@
+import logging
 from typing import Any
 from fastapi import FastAPI
 from opentelemetry import trace
@@ -12,35 +13,55 @@ import sentry_sdk
 from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 from app.core.config import Settings
 
+logger = logging.getLogger(__name__)
+
 def setup_monitoring(app: FastAPI, settings: Settings) -> None:
     """Configure application monitoring and tracing."""
     
-    # Set up OpenTelemetry tracing
-    resource = Resource.create({"service.name": settings.PROJECT_NAME})
-    tracer_provider = TracerProvider(resource=resource)
-    
-    jaeger_exporter = JaegerExporter(
-        agent_host_name="localhost",
-        agent_port=6831,
-    )
-    
-    tracer_provider.add_span_processor(BatchSpanProcessor(jaeger_exporter))
-    trace.set_tracer_provider(tracer_provider)
-    
-    
-    FastAPIInstrumentor.instrument_app(app, server_request_hook=None, client_request_hook=None)
-    
-    httpx_instrumentor = HTTPXClientInstrumentor()
-    httpx_instrumentor.instrument()
-    
+    # Set up OpenTelemetry tracing. Tracing is best-effort: a broken or
+    # unreachable collector must never take down the request path, so the
+    # whole pipeline setup is fenced off.
+    try:
+        resource = Resource.create({"service.name": settings.PROJECT_NAME})
+        tracer_provider = TracerProvider(resource=resource)
+
+        jaeger_exporter = JaegerExporter(
+            agent_host_name="localhost",
+            agent_port=6831,
+        )
+
+        # Bounded batching keeps span export off the request path: frequent
+        # small export batches stay under the Jaeger UDP packet limit, and
+        # the queue bound caps tracing memory under load
+        tracer_provider.add_span_processor(
+            BatchSpanProcessor(
+                jaeger_exporter,
+                max_queue_size=4096,
+                max_export_batch_size=512,
+                schedule_delay_millis=2000,
+                export_timeout_millis=10000,
+            )
+        )
+        trace.set_tracer_provider(tracer_provider)
+
+        FastAPIInstrumentor.instrument_app(app, server_request_hook=None, client_request_hook=None)
+
+        # httpx spans instrument the per-request auth call, which is the hot
+        # loop; only pay for them when explicitly enabled
+        if settings.TRACE_HTTPX:
+            httpx_instrumentor = HTTPXClientInstrumentor()
+            httpx_instrumentor.instrument()
+    except Exception as e:
+        logger.warning(f"Tracing setup failed, continuing without tracing: {e}")
+
     # Start Prometheus metrics server
     start_http_server(port=9090)
-    
+
     # Configure Sentry if DSN is provided
     if settings.SENTRY_DSN:
         sentry_sdk.init(
             dsn=settings.SENTRY_DSN,
-            traces_sample_rate=1.0,
+            traces_sample_rate=settings.SENTRY_TRACES_SAMPLE_RATE,
             environment="production",
         )
         app.add_middleware(SentryAsgiMiddleware)
@@ -13,7 +13,15 @@ class Database:
     @classmethod
     async def connect_db(cls):
         try:
-            cls.client = AsyncIOMotorClient(settings.MONGODB_URL)
+            # Motor pools connections internally; size the pool explicitly
+            # and keep a few connections warm so requests don't pay
+            # connection setup cost
+            cls.client = AsyncIOMotorClient(
+                settings.MONGODB_URL,
+                maxPoolSize=50,
+                minPoolSize=5,
+                maxIdleTimeMS=60000,
+            )
             
             await cls.client.admin.command("ping")
             
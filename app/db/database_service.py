@@ -1,4 +1,6 @@
 # services/user_service.py
+import asyncio
+import logging
 from datetime import datetime
 from bson import ObjectId
 from fastapi import HTTPException, status
@@ -6,15 +8,66 @@ from fastapi import HTTPException, status
 # from app.models.user import UserInDB, UserUpdate
 from app.db.config import Database
 
+logger = logging.getLogger(__name__)
+
 class DBService:
+    # History writes are coalesced in memory and flushed periodically so
+    # each request doesn't pay its own DB round-trip
+    HISTORY_FLUSH_INTERVAL = 1.0  # seconds
+    HISTORY_FLUSH_BATCH = 100
+
     def __init__(self):
         self.db = None
-    
+        self._history_queue: asyncio.Queue = asyncio.Queue()
+        self._writer_task = None
+
     async def _get_db(self):
         if self.db is None:
             self.db = await Database.get_db()
         return self.db
 
+    def enqueue_history(self, user_id: str, flight_details: dict):
+        """Queue a search-history write for the background writer."""
+        self._history_queue.put_nowait((user_id, flight_details))
+
+    async def start_history_writer(self):
+        """Start the background task that flushes queued history writes."""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._history_writer())
+
+    async def stop_history_writer(self):
+        """Stop the writer task and drain any remaining queued writes."""
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        await self._flush_history()
+
+    async def _history_writer(self):
+        while True:
+            await asyncio.sleep(self.HISTORY_FLUSH_INTERVAL)
+            await self._flush_history()
+
+    async def _flush_history(self):
+        # Deduplicate by (user, flight) so repeated searches within one
+        # flush window collapse into a single write
+        batch = {}
+        while not self._history_queue.empty() and len(batch) < self.HISTORY_FLUSH_BATCH:
+            user_id, details = self._history_queue.get_nowait()
+            batch[(user_id, details.get("flight_number"))] = (user_id, details)
+
+        for user_id, details in batch.values():
+            try:
+                await self.save_flight_search_history(
+                    user_id=user_id,
+                    flight_details=details
+                )
+            except Exception as e:
+                logger.error(f"Failed to flush search history for user {user_id}: {e}")
+
     
     async def get_latest_item(self, collection_name: str, search_field: str, search_value):
         db = await self._get_db()
@@ -91,3 +144,6 @@ class DBService:
         # Fetch and return the updated document
         updated_doc = await db["flight_search_history"].find_one({"user_id": user_id})
         return self._serialize_doc(updated_doc)
+
+
+db_service = DBService()
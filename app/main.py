@@ -8,11 +8,18 @@ import sys
 # Third-party imports
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
 # Local application imports
 
 from app.db.config import Database
+from app.db.database_service import db_service
+from app.core.dependencies import auth_handler
+from app.core.logging import setup_logging, stop_logging
+from app.services.rapid_flight_service import RapidFlightService
+from app.services.flight_updates_service import flight_service as flight_updates_service
 from app.core.config import settings
 from app.api.routes.index import router as index_route
 
@@ -28,15 +35,23 @@ async def lifespan(app: FastAPI):
     """Manage application lifecycle events"""
     try:
         # Startup logic
+        setup_logging()
         mongodb = await Database.connect_db()
         if not mongodb:
             logger.error("MongoDB connection failed. Exiting the app.")
             sys.exit(1)
 
-        yield 
-        
+        await db_service.start_history_writer()
+
+        yield
+
     finally:
+        await db_service.stop_history_writer()
+        await flight_updates_service.aclose()
+        await RapidFlightService.aclose()
+        await auth_handler.aclose()
         await Database.close_db()
+        stop_logging()
         
 
 # Initialize FastAPI app with configuration
@@ -46,7 +61,8 @@ app = FastAPI(
     version=settings.VERSION,
     description="BoardAndGo flight Agent Authentication",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -58,6 +74,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON/SSE payloads; small responses pass through untouched
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Health check route
 @router.get("/health")
 def health_check():
@@ -81,6 +100,17 @@ app.include_router(router)
 app.include_router(index_route, prefix=settings.API_V1_STR)
 
 
+if __name__ == "__main__":
+    # Same loop/parser flags as the container CMD, for running outside Docker
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+    )
+
+
 
 
 
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
@@ -17,10 +17,13 @@ class DataSource(str, Enum):
     ESTIMATED = "ESTIMATED"
 
 class FlightPosition(BaseModel):
+    # Aliases match the FR24 wire names so raw API items validate directly
+    model_config = ConfigDict(populate_by_name=True)
+
     lat: float = Field(..., description="Latitude")
     lon: float = Field(..., description="Longitude")
-    altitude: int = Field(..., description="Altitude in feet")
-    ground_speed: int = Field(..., description="Ground speed in knots")
+    altitude: int = Field(..., alias="alt", description="Altitude in feet")
+    ground_speed: int = Field(..., alias="gspeed", description="Ground speed in knots")
     track: int = Field(..., description="Track angle in degrees")
     timestamp: datetime
 
@@ -32,9 +35,11 @@ class FlightRequest(BaseModel):
     limit: Optional[int] = Field(None, le=30000, description="Maximum number of results")
 
 class FlightResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
     fr24_id: str
-    flight_number: Optional[str]
+    flight_number: Optional[str] = Field(None, alias="flight")
     callsign: str
     position: FlightPosition
-    aircraft_type: Optional[str]
-    registration: Optional[str]
+    aircraft_type: Optional[str] = Field(None, alias="type")
+    registration: Optional[str] = Field(None, alias="reg")
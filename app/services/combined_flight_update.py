@@ -1,9 +1,8 @@
 import asyncio
-import json
 from datetime import datetime
 from typing import Dict, Optional
 import logging
-from fastapi.encoders import jsonable_encoder
+import orjson
 from app.core.config import settings
 from app.services.flight_updates_service import FlightUpdateService
 from app.services.flight_service import FlightService
@@ -11,22 +10,86 @@ from app.schemas.flight_updates_schema import FlightRequest
 
 logger = logging.getLogger(__name__)
 
+# Frames carry datetimes as-is and orjson formats them in C; naive stamps
+# from utcnow() are emitted as UTC with a Z suffix
+_ORJSON_OPTS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+class LiveFlightBatcher:
+    """Coalesce concurrent live-flight lookups into one FR24 call.
+
+    FR24's endpoint accepts a comma-separated flight list, so lookups that
+    arrive within a short window are collected and issued as a single
+    request, with results fanned back out through per-caller futures.
+    Keeps outbound QPS at one call per window however many streams are
+    watching flights.
+    """
+
+    BATCH_WINDOW = 0.2  # seconds to collect lookups before flushing
+
+    def __init__(self, position_service: FlightUpdateService):
+        self._position_service = position_service
+        self._pending: Dict[str, list] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def get(self, flight_icao: str):
+        """Return the FlightResponse for one flight, or None if not live."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(flight_icao.upper(), []).append(future)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.BATCH_WINDOW)
+        pending, self._pending = self._pending, {}
+        # Un-arm before awaiting upstream: a lookup arriving while this
+        # call is in flight lands in the fresh _pending dict and must be
+        # able to schedule its own flush, or it would wait forever
+        self._flush_task = None
+        if not pending:
+            return
+        try:
+            flights = await self._position_service.get_live_flights(
+                FlightRequest.model_construct(flights=list(pending))
+            )
+            by_key: Dict[str, object] = {}
+            for flight in flights:
+                if flight.callsign:
+                    by_key[flight.callsign.upper()] = flight
+                if flight.flight_number:
+                    by_key[flight.flight_number.upper()] = flight
+            for icao, futures in pending.items():
+                result = by_key.get(icao)
+                for future in futures:
+                    if not future.done():
+                        future.set_result(result)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+
 class CombinedFlightService:
     def __init__(self):
         self.position_service = FlightUpdateService()
         self.flight_service = FlightService(settings)
+        self.batcher = LiveFlightBatcher(self.position_service)
         self.POSITION_UPDATE_INTERVAL = 60  # 30 seconds
         self.FLIGHT_INFO_UPDATE_INTERVAL = 120  # 2 minutes
+        # Raw flight info rarely changes between 2-minute refreshes; keep
+        # (digest, formatted) per flight so identical payloads skip the
+        # whole schema construction pass
+        self._info_cache: Dict[str, tuple] = {}
 
     async def fetch_position_data(self, flight_icao: str) -> Optional[Dict]:
         """Fetch position data for a flight"""
         try:
-            position_data = await self.position_service.get_live_flights(
-                FlightRequest(flights=[flight_icao])
-            )
-            # Position data is now a list of FlightResponse objects
-            if position_data and len(position_data) > 0:
-                flight = position_data[0]  # Get first flight
+            # Lookups from concurrent streams are coalesced into one FR24
+            # call per batch window
+            flight = await self.batcher.get(flight_icao)
+            if flight:
                 return {
                     'lat': flight.position.lat,
                     'lon': flight.position.lon,
@@ -45,78 +108,101 @@ class CombinedFlightService:
         try:
             raw_data = await self.flight_service.fetch_flight_data(flight_icao)
             if raw_data:
+                digest = hash(orjson.dumps(raw_data, option=orjson.OPT_SORT_KEYS))
+                cached = self._info_cache.get(flight_icao)
+                if cached is not None and cached[0] == digest:
+                    return cached[1]
+
                 # Format the data using the existing service method
                 formatted_data = await self.flight_service.format_flight_data(raw_data)
+                self._info_cache[flight_icao] = (digest, formatted_data)
                 return formatted_data
             return None
         except Exception as e:
             logger.error(f"Error fetching flight info: {str(e)}")
             return None
 
+    async def _position_loop(self, flight_icao: str, queue: asyncio.Queue):
+        """Push a position update into the queue every interval."""
+        while True:
+            try:
+                position_data = await self.fetch_position_data(flight_icao)
+                await queue.put(("position", position_data))
+            except Exception as e:
+                logger.error(f"Error in position loop: {str(e)}")
+                await queue.put(("error", str(e)))
+            await asyncio.sleep(self.POSITION_UPDATE_INTERVAL)
+
+    async def _flight_info_loop(self, flight_icao: str, queue: asyncio.Queue):
+        """Push an enriched flight-info update into the queue every interval."""
+        while True:
+            try:
+                new_flight_info = await self.fetch_flight_info(flight_icao)
+                if new_flight_info:
+                    enriched = await self.position_service.update_airport_details(new_flight_info)
+                    if enriched:
+                        new_flight_info = enriched
+                await queue.put(("flight_info", new_flight_info))
+            except Exception as e:
+                logger.error(f"Error in flight info loop: {str(e)}")
+                await queue.put(("error", str(e)))
+            await asyncio.sleep(self.FLIGHT_INFO_UPDATE_INTERVAL)
+
     async def stream_combined_flight_data(self, flight_icao: str):
         """
         Stream combined flight data with:
         - Position updates every 30 seconds
         - Flight info updates every 2 minutes
+
+        The two cadences run as independent child tasks feeding one queue,
+        so neither refresh waits on the other; closing the generator
+        (client disconnect) cancels both loops in the finally block, the
+        same teardown stream_live_flights applies to its poller task.
         """
         flight_info = None
-        last_flight_info_update = 0
-        last_position_update = 0
+        queue: asyncio.Queue = asyncio.Queue()
 
-        while True:
-            try:
-                current_time = asyncio.get_event_loop().time()
-                update_position = (current_time - last_position_update) >= self.POSITION_UPDATE_INTERVAL
-                update_flight_info = (current_time - last_flight_info_update) >= self.FLIGHT_INFO_UPDATE_INTERVAL
-                # Update flight info if needed
-                if update_flight_info:
-                    new_flight_info = await self.fetch_flight_info(flight_icao)
-                    if new_flight_info:  
-                        flight_info_with_airport_details = await self.position_service.update_airport_details(new_flight_info)
-                        flight_info= flight_info_with_airport_details if flight_info_with_airport_details else flight_info
-                        
-                        
-                        
-                    last_flight_info_update = current_time
-
-                # Update position if needed
-                position_data = None
-                if update_position:
-                    position_data = await self.fetch_position_data(flight_icao)
-                    last_position_update = current_time
-
-
-                # Combine and send data if either was updated
-                if update_position or update_flight_info:
-                    combined_data = {
-                        "flight_info": jsonable_encoder(flight_info) if flight_info else None,
-                        "live": jsonable_encoder(position_data),
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "update_type": {
-                            "position": update_position,
-                            "flight_info": update_flight_info
-                        }
+        tasks = [
+            asyncio.create_task(self._position_loop(flight_icao, queue)),
+            asyncio.create_task(self._flight_info_loop(flight_icao, queue)),
+        ]
+        try:
+            while True:
+                kind, payload = await queue.get()
+
+                if kind == "error":
+                    error_data = {
+                        "timestamp": datetime.utcnow(),
+                        "error": payload
                     }
-                    
-                    yield json.dumps(combined_data)
+                    yield orjson.dumps(error_data, option=_ORJSON_OPTS).decode()
+                    continue
 
-                # Calculate sleep time until next update
-                time_to_next_position = self.POSITION_UPDATE_INTERVAL - (current_time - last_position_update)
-                time_to_next_flight_info = self.FLIGHT_INFO_UPDATE_INTERVAL - (current_time - last_flight_info_update)
-                sleep_time = min(time_to_next_position, time_to_next_flight_info)
-                
-                await asyncio.sleep(max(1, sleep_time))  # Ensure minimum 1 second sleep
+                update_position = kind == "position"
+                update_flight_info = kind == "flight_info"
+                position_data = payload if update_position else None
+                if update_flight_info and payload:
+                    flight_info = payload
 
-            except Exception as e:
-                logger.error(f"Error in stream_combined_flight_data: {str(e)}")
-                error_data = {
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "error": str(e)
+                # pydantic's own serializer plus orjson replaces the
+                # jsonable_encoder reflection walk; orjson also handles
+                # the datetime in position_data natively
+                combined_data = {
+                    "flight_info": flight_info.model_dump(mode="json") if flight_info else None,
+                    "live": position_data,
+                    "timestamp": datetime.utcnow(),
+                    "update_type": {
+                        "position": update_position,
+                        "flight_info": update_flight_info
+                    }
                 }
-                yield json.dumps(error_data)
-                await asyncio.sleep(5)  # Wait before retry
-                
-                
+
+                yield orjson.dumps(combined_data, option=_ORJSON_OPTS).decode()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
 combine_flight=CombinedFlightService()
 
 # import asyncio
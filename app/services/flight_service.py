@@ -1,5 +1,7 @@
 from typing import Optional, Dict
 import httpx
+import orjson
+import redis.asyncio as aioredis
 from fastapi import HTTPException, status
 from app.schemas.flight import FlightDataResponseSchema
 from app.core.config import Settings
@@ -14,24 +16,66 @@ from tenacity import (
     retry_if_exception_type
 )
 
+# Hoisted out of the per-call paths: the status table was rebuilt on every
+# _normalize_status call and the ICAO pattern re-looked-up per validation
+_STATUS_MAP = {
+    'scheduled': 'SCHEDULED',
+    'active': 'ACTIVE',
+    'landed': 'LANDED',
+    'cancelled': 'CANCELLED',
+    'diverted': 'DIVERTED',
+    'incident': 'INCIDENT',
+    'unknown': 'UNKNOWN'
+}
+
+_ICAO_RE = re.compile(r'^[A-Z0-9]{6,8}$')
+
 class FlightService:
+    # Flight info refreshes every 2 minutes per stream; a short shared TTL
+    # collapses concurrent viewers of the same flight to one upstream call
+    CACHE_TTL = 60
+
     def __init__(self, settings: Settings):
         self.settings = settings
         self.client = httpx.AsyncClient(
             timeout=settings.API_TIMEOUT,
             limits=httpx.Limits(max_keepalive_connections=5, max_connections=10)
         )
+        # Cache is best-effort: an unreachable Redis must never fail a
+        # fetch, so every cache call is fenced with its own try/except
+        self._redis = aioredis.from_url(
+            settings.REDIS_URL, decode_responses=False
+        )
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.client.aclose()
+        try:
+            await self._redis.aclose()
+        except Exception:
+            pass
+
+    async def _cache_get(self, key: str) -> Optional[Dict]:
+        try:
+            cached = await self._redis.get(key)
+            if cached is not None:
+                return orjson.loads(cached)
+        except Exception as e:
+            logger.debug("Redis get failed for %s: %s", key, e)
+        return None
+
+    async def _cache_set(self, key: str, value: Dict) -> None:
+        try:
+            await self._redis.set(key, orjson.dumps(value), ex=self.CACHE_TTL)
+        except Exception as e:
+            logger.debug("Redis set failed for %s: %s", key, e)
 
     @staticmethod
     def validate_flight_icao(flight_icao: str) -> bool:
         """Validate ICAO flight identifier format."""
-        return bool(re.match(r'^[A-Z0-9]{6,8}$', flight_icao.upper()))
+        return _ICAO_RE.match(flight_icao.upper()) is not None
 
     @retry(
         stop=stop_after_attempt(3),
@@ -42,6 +86,11 @@ class FlightService:
         """
         Fetch flight data from the aviation API with retry logic and circuit breaking.
         """
+        cache_key = f"avstack:{flight_iata}"
+        cached = await self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             logger.info(f"Fetching flight data for {flight_iata}")
             response = await self.client.get(
@@ -56,9 +105,7 @@ class FlightService:
                     # "flight_icao": flight_icao,
             response.raise_for_status()
             data = response.json()
-            print("data: ",data)
-            
-            logger.info(f"Received data from aviationstack: {data}")
+            logger.debug("Received data from aviationstack: %s", data)
             
             if not data or "data" not in data:
                 logger.warning(f"No data received for flight {flight_iata}")
@@ -68,8 +115,10 @@ class FlightService:
             if not flights:
                 logger.warning(f"No flights found for {flight_iata}")
                 return None
-            
-            return flights[0]
+
+            flight = flights[0]
+            await self._cache_set(cache_key, flight)
+            return flight
 
         except httpx.HTTPStatusError as e:
             logger.error(f"API request failed with status {e.response.status_code}")
@@ -126,15 +175,26 @@ class FlightService:
         if not dt_str:
             return None
         try:
-            return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
+            # fromisoformat accepts 'Z' directly on 3.11+; only pay for the
+            # string copy when it doesn't
+            try:
+                return datetime.fromisoformat(dt_str)
+            except ValueError:
+                return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
         except (ValueError, TypeError):
             return None
 
+    # The API usually returns these as numbers already; the isinstance
+    # checks skip the float() call and try/except on that common case
+
     @staticmethod
     def _validate_coordinate(value: Optional[float]) -> Optional[float]:
         """Validate geographic coordinates."""
         if value is None:
             return None
+        if isinstance(value, (int, float)):
+            value = float(value)
+            return value if -180 <= value <= 180 else None
         try:
             value = float(value)
             if -180 <= value <= 180:
@@ -148,6 +208,9 @@ class FlightService:
         """Validate direction in degrees."""
         if value is None:
             return None
+        if isinstance(value, (int, float)):
+            value = float(value)
+            return value if 0 <= value < 360 else None
         try:
             value = float(value)
             if 0 <= value < 360:
@@ -161,6 +224,8 @@ class FlightService:
         """Validate numeric values."""
         if value is None:
             return None
+        if isinstance(value, float):
+            return value
         try:
             return float(value)
         except (ValueError, TypeError):
@@ -171,16 +236,7 @@ class FlightService:
         """Normalize flight status values."""
         if not status:
             return None
-        status_map = {
-            'scheduled': 'SCHEDULED',
-            'active': 'ACTIVE',
-            'landed': 'LANDED',
-            'cancelled': 'CANCELLED',
-            'diverted': 'DIVERTED',
-            'incident': 'INCIDENT',
-            'unknown': 'UNKNOWN'
-        }
-        return status_map.get(status.lower(), 'UNKNOWN')
+        return _STATUS_MAP.get(status.lower(), 'UNKNOWN')
 
     def _generate_description(self, flight_info: Dict) -> str:
         """Generate a human-readable flight description."""
@@ -1,16 +1,98 @@
 import asyncio
-import json
-from datetime import datetime
+import math
+import random
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
 import logging
 from typing import Dict, Optional
-from fastapi.encoders import jsonable_encoder
 import httpx
+import orjson
 
 from app.core.config import Settings, settings
 
 logger = logging.getLogger(__name__)
 
+
+class _AIMDGate:
+    """Additive-increase/multiplicative-decrease concurrency gate.
+
+    Lets concurrent upstream calls probe for headroom: each success nudges
+    the limit up additively, a rate-limit or server error halves it. Keeps
+    aggregate concurrency near the edge of the provider's capacity without
+    tripping it the way a fixed semaphore sized for the worst case would.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16,
+                 increase: float = 0.5, backoff: float = 0.5):
+        self._limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._increase = increase
+        self._backoff = backoff
+        self._active = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            while self._active >= int(self._limit):
+                await self._cond.wait()
+            self._active += 1
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        async with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        self._limit = min(float(self._maximum), self._limit + self._increase)
+
+    def on_error(self) -> None:
+        self._limit = max(float(self._minimum), self._limit * self._backoff)
+
+
 class RapidFlightService:
+    # One keep-alive client shared by all instances so repeated fetches
+    # reuse sockets instead of paying a TCP+TLS handshake per call
+    _client: Optional[httpx.AsyncClient] = None
+    _client_lock = asyncio.Lock()
+
+    # One upstream poller per flight, shared across instances (websocket
+    # handlers build one service per connection), fanned out to subscriber
+    # queues so upstream QPS stays O(1) in the number of clients
+    _topics: Dict[str, Dict] = {}
+
+    # Throttling state is shared across instances for the same reason:
+    # the provider meters one API key, not one connection, so quota
+    # headers seen by any instance must slow all of them and the AIMD
+    # gate must bound aggregate concurrency, not per-connection
+    _rl_remaining: float = math.inf
+    _rl_reset_at: float = 0.0
+    _request_times: deque = deque()
+    _aimd = _AIMDGate()
+
+    @classmethod
+    async def get_client(cls) -> httpx.AsyncClient:
+        if cls._client is None:
+            async with cls._client_lock:
+                if cls._client is None:
+                    cls._client = httpx.AsyncClient(
+                        http2=True,
+                        timeout=settings.API_TIMEOUT,
+                        limits=httpx.Limits(
+                            max_keepalive_connections=50,
+                            max_connections=100
+                        )
+                    )
+        return cls._client
+
+    @classmethod
+    async def aclose(cls):
+        """Close the shared client; called on application shutdown."""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
     def __init__(self):
         self.API_URL = "https://flight-data4.p.rapidapi.com/get_flight_info"
         self.API_HEADERS = {
@@ -18,25 +100,121 @@ class RapidFlightService:
             "x-rapidapi-host": "flight-data4.p.rapidapi.com"
         }
         self.UPDATE_INTERVAL = 60  # 60 seconds
+        self.CACHE_TTL = 30  # seconds; flight info is stable on this scale
+        self.MAX_BACKOFF = 30.0  # cap so late retries don't stall for minutes
+        # Transient upstream states worth retrying alongside 429
+        self.RETRYABLE_STATUSES = {429, 502, 503, 504}
         self._stop_event = asyncio.Event()
+        self._cache: Dict[str, tuple] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Proactive throttling: quota state read from provider headers,
+        # plus a local sliding window for responses that carry none.
+        # Pausing here is cheaper than paying a round-trip for a 429.
+        # The state itself lives on the class (see above).
+        self.RL_MIN_REMAINING = 2  # hold back before the quota actually hits zero
         
     async def fetch_flight_data(self, flight_icao: str, retries: int = 3) -> Optional[Dict]:
-        """Fetch flight data with retry logic."""
+        """Fetch flight data, serving recent results from a short TTL cache.
+
+        Concurrent requests for the same flight share one upstream call via
+        a per-flight lock.
+        """
+        cached = self._cache.get(flight_icao)
+        if cached and time.monotonic() - cached[0] < self.CACHE_TTL:
+            return cached[1]
+
+        async with self._locks[flight_icao]:
+            # Another coroutine may have populated the cache while we waited
+            cached = self._cache.get(flight_icao)
+            if cached and time.monotonic() - cached[0] < self.CACHE_TTL:
+                return cached[1]
+
+            data = await self._fetch_flight_data(flight_icao, retries)
+            if data is not None:
+                self._cache[flight_icao] = (time.monotonic(), data)
+            return data
+
+    def _note_rate_limit_headers(self, headers) -> None:
+        """Record provider quota state from rate-limit response headers."""
+        remaining = (
+            headers.get("x-ratelimit-requests-remaining")
+            or headers.get("x-ratelimit-remaining-requests")
+        )
+        try:
+            type(self)._rl_remaining = int(remaining)
+        except (TypeError, ValueError):
+            return
+        reset = (
+            headers.get("x-ratelimit-requests-reset")
+            or headers.get("x-ratelimit-reset")
+        )
+        try:
+            type(self)._rl_reset_at = time.monotonic() + float(reset)
+        except (TypeError, ValueError):
+            pass
+
+    async def _wait_if_throttled(self) -> None:
+        """Pause before a request that would predictably be rate-limited.
+
+        Uses the provider's advertised remaining quota when known, and a
+        local sliding window of request timestamps as the fallback.
+        """
+        now = time.monotonic()
+        if self._rl_remaining <= self.RL_MIN_REMAINING and now < self._rl_reset_at:
+            delay = self._rl_reset_at - now
+            logger.warning(
+                "Rate-limit quota nearly exhausted; pausing %.2f seconds", delay
+            )
+            await asyncio.sleep(delay)
+            type(self)._rl_remaining = math.inf
+
+        while True:
+            now = time.monotonic()
+            window = settings.RATE_LIMIT_WINDOW
+            while self._request_times and now - self._request_times[0] >= window:
+                self._request_times.popleft()
+            if len(self._request_times) < settings.RATE_LIMIT_REQUESTS:
+                break
+            await asyncio.sleep(self._request_times[0] + window - now)
+        self._request_times.append(time.monotonic())
+
+    async def _fetch_flight_data(self, flight_icao: str, retries: int = 3) -> Optional[Dict]:
+        """Fetch flight data from the upstream API with retry logic."""
+        client = await self.get_client()
         for attempt in range(retries):
             try:
-                async with httpx.AsyncClient() as client:
+                await self._wait_if_throttled()
+                async with self._aimd:
                     response = await client.get(
                         self.API_URL,
                         headers=self.API_HEADERS,
                         params={"flight": flight_icao}
                     )
-                    await response.aread()  # Ensure response body is read
-                    response.raise_for_status()
-                    return response.json()
+                    content = await response.aread()
+                response.raise_for_status()
+                self._note_rate_limit_headers(response.headers)
+                self._aimd.on_success()
+                # Body bytes are already in hand; orjson parses them in C
+                # without the dispatch through response.json()
+                return orjson.loads(content)
             except httpx.HTTPStatusError as e:
-                if e.response.status_code == 429:  # Rate limit exceeded
-                    wait_time = 2 ** attempt  # Exponential backoff
-                    logger.warning(f"Rate limit exceeded. Retrying in {wait_time} seconds...")
+                status_code = e.response.status_code
+                if status_code in self.RETRYABLE_STATUSES:
+                    self._aimd.on_error()
+                    # Honor an explicit Retry-After; otherwise full-jitter
+                    # exponential backoff so parallel clients sharing the
+                    # quota don't retry in lockstep
+                    retry_after = e.response.headers.get("retry-after")
+                    try:
+                        wait_time = min(self.MAX_BACKOFF, float(retry_after))
+                    except (TypeError, ValueError):
+                        wait_time = random.uniform(
+                            0, min(self.MAX_BACKOFF, 2.0 ** attempt)
+                        )
+                    logger.warning(
+                        "Upstream returned %s. Retrying in %.2f seconds...",
+                        status_code, wait_time
+                    )
                     await asyncio.sleep(wait_time)
                     continue
                 logger.error(f"HTTP error fetching flight data: {str(e)}")
@@ -50,62 +228,131 @@ class RapidFlightService:
         """Stop the streaming loop."""
         self._stop_event.set()
 
+    async def _poll_flight(self, flight_icao: str):
+        """Poll upstream for one flight and fan frames out to subscribers.
+
+        The first tick fetches immediately; later ticks sleep the update
+        interval. Frames end with a None sentinel when the flight
+        disappears or an error frame was sent, so subscribers stop too.
+        """
+        topic = type(self)._topics.get(flight_icao)
+        if topic is None:
+            return
+        first = True
+        try:
+            while True:
+                if not first:
+                    await asyncio.sleep(self.UPDATE_INTERVAL)
+
+                frame = None
+                end = False
+                try:
+                    logger.debug(f"Fetching flight data for {flight_icao}")
+                    fetch_flight = await self.fetch_flight_data(flight_icao)
+                    flight_data = fetch_flight.get(flight_icao)
+                    # One timestamp per tick, shared by whichever frame goes
+                    # out; orjson formats the aware datetime in C
+                    now = datetime.now(timezone.utc)
+
+                    if flight_data:
+                        frame = orjson.dumps({
+                            "flight_info": flight_data.get("flight"),
+                            "timestamp": now
+                        })
+                    else:
+                        if first:
+                            logger.warning("No flight data received")
+                            frame = orjson.dumps({
+                                "timestamp": now,
+                                "error": f"Flight {flight_icao} not found"
+                            })
+                        end = True
+                except Exception as e:
+                    logger.error(f"Error in stream_flight_data: {str(e)}")
+                    frame = orjson.dumps({
+                        "timestamp": datetime.now(timezone.utc),
+                        "error": str(e)
+                    })
+                    end = True
+
+                if type(self)._topics.get(flight_icao) is not topic:
+                    return
+                for queue in list(topic["subscribers"]):
+                    if frame is not None:
+                        # Drop the stale frame rather than block the poller
+                        # on a slow consumer
+                        if queue.full():
+                            try:
+                                queue.get_nowait()
+                            except asyncio.QueueEmpty:
+                                pass
+                        queue.put_nowait(frame)
+                    if end:
+                        # Same drop-if-full guard for the sentinel: a full
+                        # queue raising QueueFull here would kill the
+                        # poller with the topic still registered
+                        if queue.full():
+                            try:
+                                queue.get_nowait()
+                            except asyncio.QueueEmpty:
+                                pass
+                        queue.put_nowait(None)
+                if end:
+                    return
+
+                first = False
+        finally:
+            # Unregister in a finally so no exit path — including an
+            # unexpected error — strands a dead topic that future
+            # subscribers would attach to
+            if type(self)._topics.get(flight_icao) is topic:
+                type(self)._topics.pop(flight_icao, None)
+
     async def stream_flight_data(self, flight_icao: str):
+        """Yield flight-data frames immediately and then once per interval.
+
+        Subscribers for the same flight share a single upstream poller;
+        each client consumes frames from its own queue, so upstream calls
+        stay constant however many clients watch a flight.
+        """
         logger.info(f"Starting flight data stream for {flight_icao}")
+        topic = type(self)._topics.get(flight_icao)
+        if topic is None:
+            topic = {"subscribers": set(), "task": None}
+            type(self)._topics[flight_icao] = topic
+            topic["task"] = asyncio.create_task(self._poll_flight(flight_icao))
+
+        # Room for one data frame plus the end sentinel
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        topic["subscribers"].add(queue)
+        stop_waiter = asyncio.create_task(self._stop_event.wait())
+        getter: Optional[asyncio.Task] = None
         try:
-            logger.debug(f"Fetching flight data for {flight_icao}")
-            fetch_flight = await self.fetch_flight_data(flight_icao)
-            flight_data = fetch_flight.get(flight_icao)
-            
-            if flight_data:
-                logger.debug(f"Received flight data: {flight_data.get('flight')}")
-                formatted_data = {
-                    "flight_info": jsonable_encoder(flight_data.get("flight")),
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                yield json.dumps(formatted_data)
-            else:
-                logger.warning("No flight data received")
-                error_data = {
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "error": f"Flight {flight_icao} not found"
-                }
-                yield json.dumps(error_data)
-                return  # Exit the generator when no flight is found
-                
-        except Exception as e:
-            logger.error(f"Error in stream_flight_data: {str(e)}")
-            error_data = {
-                "timestamp": datetime.utcnow().isoformat(),
-                "error": str(e)
-            }
-            yield json.dumps(error_data)
-            return  # Exit the generator on error
-
-        while not self._stop_event.is_set():
-            try:
-                await asyncio.sleep(self.UPDATE_INTERVAL)
-                fetch_flight = await self.fetch_flight_data(flight_icao)
-                flight_data = fetch_flight.get(flight_icao)
-                
-                if flight_data:
-                    formatted_data = {
-                        "flight_info": jsonable_encoder(flight_data.get("flight")),
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                    yield json.dumps(formatted_data)
-                else:
-                    break  # Exit the loop if flight data becomes unavailable
-                    
-            except Exception as e:
-                logger.error(f"Error in stream_flight_data: {str(e)}")
-                error_data = {
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "error": str(e)
-                }
-                yield json.dumps(error_data)
-                break  # Exit the loop on error
-                
+            while not self._stop_event.is_set():
+                getter = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, stop_waiter}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter not in done:
+                    getter.cancel()
+                    break  # stop_streaming() was called
+                frame = getter.result()
+                if frame is None:
+                    break  # Poller finished for this flight
+                yield frame
+        finally:
+            stop_waiter.cancel()
+            # asyncio.wait leaves its awaitables running when we're
+            # cancelled mid-wait; reap the pending getter or it leaks
+            # against a queue nobody will fill again
+            if getter is not None and not getter.done():
+                getter.cancel()
+            topic["subscribers"].discard(queue)
+            if not topic["subscribers"] and type(self)._topics.get(flight_icao) is topic:
+                # Last client gone: stop polling upstream for this flight
+                topic["task"].cancel()
+                type(self)._topics.pop(flight_icao, None)
+
         logger.info(f"Stopped flight data stream for {flight_icao}")
 
 rapit_service = RapidFlightService()
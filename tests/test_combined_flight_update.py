@@ -0,0 +1,73 @@
+# test_combined_flight_update.py
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.combined_flight_update import LiveFlightBatcher
+
+class TestLiveFlightBatcher(unittest.IsolatedAsyncioTestCase):
+    @staticmethod
+    def _flight(callsign):
+        flight = MagicMock()
+        flight.callsign = callsign
+        flight.flight_number = None
+        return flight
+
+    async def test_concurrent_lookups_share_one_upstream_call(self):
+        # Arrange
+        service = MagicMock()
+        service.get_live_flights = AsyncMock(
+            return_value=[self._flight("AAA111"), self._flight("BBB222")]
+        )
+        batcher = LiveFlightBatcher(service)
+        batcher.BATCH_WINDOW = 0.01
+
+        # Act
+        results = await asyncio.gather(
+            batcher.get("aaa111"),
+            batcher.get("bbb222"),
+            batcher.get("CCC333"),
+        )
+
+        # Assert: one upstream call for the whole batch, results fanned
+        # back out per caller (case-insensitively), misses resolve to None
+        service.get_live_flights.assert_awaited_once()
+        request = service.get_live_flights.await_args.args[0]
+        self.assertEqual(sorted(request.flights), ["AAA111", "BBB222", "CCC333"])
+        self.assertEqual(results[0].callsign, "AAA111")
+        self.assertEqual(results[1].callsign, "BBB222")
+        self.assertIsNone(results[2])
+
+    async def test_lookup_during_inflight_flush_is_not_stranded(self):
+        # Arrange: the first upstream call blocks until released, so the
+        # second lookup arrives while a flush is in flight
+        release = asyncio.Event()
+        calls = []
+
+        async def slow_get_live_flights(request):
+            calls.append(list(request.flights))
+            if len(calls) == 1:
+                await release.wait()
+            return [self._flight(icao) for icao in request.flights]
+
+        service = MagicMock()
+        service.get_live_flights = AsyncMock(side_effect=slow_get_live_flights)
+        batcher = LiveFlightBatcher(service)
+        batcher.BATCH_WINDOW = 0.01
+
+        # Act
+        first = asyncio.create_task(batcher.get("AAA111"))
+        await asyncio.sleep(0.05)  # first flush is now awaiting upstream
+        second = asyncio.create_task(batcher.get("BBB222"))
+        release.set()
+        results = await asyncio.wait_for(
+            asyncio.gather(first, second), timeout=2
+        )
+
+        # Assert: the late lookup got its own flush instead of hanging
+        self.assertEqual(results[0].callsign, "AAA111")
+        self.assertEqual(results[1].callsign, "BBB222")
+        self.assertEqual(calls, [["AAA111"], ["BBB222"]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 import unittest
 from unittest.mock import AsyncMock, patch, MagicMock
 import httpx
+import orjson
 
 from app.services.rapid_flight_service import RapidFlightService
 
@@ -16,9 +17,8 @@ class TestRapidFlightService(unittest.IsolatedAsyncioTestCase):
         expected_data = {"status": "success", "data": {"flight": flight_icao}}
         
         mock_response = MagicMock()
-        mock_response.json = MagicMock(return_value=expected_data)
-        mock_response.raise_for_status = AsyncMock()
-        mock_response.aread = AsyncMock()
+        mock_response.raise_for_status = MagicMock()
+        mock_response.aread = AsyncMock(return_value=orjson.dumps(expected_data))
         mock_get.return_value = mock_response
 
         # Act
@@ -27,7 +27,7 @@ class TestRapidFlightService(unittest.IsolatedAsyncioTestCase):
         # Assert
         self.assertEqual(result, expected_data)
         mock_get.assert_called_once()
-        mock_response.raise_for_status.assert_awaited_once()
+        mock_response.raise_for_status.assert_called_once()
         mock_response.aread.assert_awaited_once()
 
     @patch('httpx.AsyncClient.get')
@@ -35,8 +35,8 @@ class TestRapidFlightService(unittest.IsolatedAsyncioTestCase):
         # Arrange
         flight_icao = "ABC123"
         mock_response = MagicMock()
-        mock_response.aread = AsyncMock()
-        mock_response.raise_for_status = AsyncMock(
+        mock_response.aread = AsyncMock(return_value=b"")
+        mock_response.raise_for_status = MagicMock(
             side_effect=httpx.HTTPStatusError(
                 message="404 Not Found",
                 request=MagicMock(),
@@ -51,7 +51,7 @@ class TestRapidFlightService(unittest.IsolatedAsyncioTestCase):
         # Assert
         self.assertIsNone(result)
         mock_get.assert_called_once()
-        mock_response.raise_for_status.assert_awaited_once()
+        mock_response.raise_for_status.assert_called_once()
         mock_response.aread.assert_awaited_once()
 
     @patch('httpx.AsyncClient.get')
@@ -74,11 +74,41 @@ class TestRapidFlightService(unittest.IsolatedAsyncioTestCase):
         flight_icao = "ABC123"
         mock_response = MagicMock()
         mock_response.aread = AsyncMock()
-        mock_response.raise_for_status = AsyncMock(
+        mock_response.raise_for_status = MagicMock(
             side_effect=httpx.HTTPStatusError(
                 message="429 Too Many Requests",
                 request=MagicMock(),
-                response=MagicMock(status_code=429)
+                response=MagicMock(status_code=429, headers={})
+            )
+        )
+        mock_get.return_value = mock_response
+        mock_sleep.return_value = None
+
+        # Act
+        result = await self.service.fetch_flight_data(flight_icao, retries=2)
+
+        # Assert
+        self.assertIsNone(result)
+        self.assertEqual(mock_get.call_count, 2)  # One call per attempt
+        # Full-jitter backoff: uniform(0, 2^attempt) per retry, capped at 30s
+        self.assertEqual(mock_sleep.await_count, 2)
+        first_wait = mock_sleep.await_args_list[0].args[0]
+        second_wait = mock_sleep.await_args_list[1].args[0]
+        self.assertTrue(0 <= first_wait <= 1)
+        self.assertTrue(0 <= second_wait <= 2)
+
+    @patch('httpx.AsyncClient.get')
+    @patch('asyncio.sleep')
+    async def test_fetch_flight_data_honors_retry_after(self, mock_sleep, mock_get):
+        # Arrange
+        flight_icao = "ABC123"
+        mock_response = MagicMock()
+        mock_response.aread = AsyncMock()
+        mock_response.raise_for_status = MagicMock(
+            side_effect=httpx.HTTPStatusError(
+                message="503 Service Unavailable",
+                request=MagicMock(),
+                response=MagicMock(status_code=503, headers={"retry-after": "7"})
             )
         )
         mock_get.return_value = mock_response
@@ -89,8 +119,7 @@ class TestRapidFlightService(unittest.IsolatedAsyncioTestCase):
 
         # Assert
         self.assertIsNone(result)
-        self.assertEqual(mock_get.call_count, 2)  # Initial call + 1 retry
-        mock_sleep.assert_awaited_once_with(1)  # 2^0 = 1 second wait on first retry
+        mock_sleep.assert_awaited_once_with(7.0)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file